@@ -2,20 +2,44 @@
     and easier-to read, chess-style coordinates.
 """
 
-import re
+import functools
+import itertools
 
+_ORD_A = ord('a')
+
+_LOCATIONS = {}  # One shared tuple for each location, from locationAt().
+
+def locationAt(row, col):
+  """ Return the coordinate tuple for the given row and column.
+      The same tuple object is returned every time for the same location,
+      so the whole run shares one tuple per grid cell.
+      >>> locationAt(1, 2)
+      (1, 2)
+      >>> locationAt(1, 2) is locationAt(1, 2)
+      True
+  """
+  key = (row, col)
+  return _LOCATIONS.setdefault(key, key)
+
+@functools.lru_cache(maxsize=None)
 def parseSquare(s):
   """ Given a chess-style pair of coordinates like a1,
       return a pair of integer coordinates.
+      There are only so many squares, so results are cached.
 
       Examples:
       >>> parseSquare('b3')
       (1, 2)
+      >>> parseSquare('c12')
+      (2, 11)
+      >>> parseSquare('3b')
+      Traceback (most recent call last):
+      ...
+      Exception: Expecting chess square, got '3b'
   """
-  (r, c) = re.search("^([a-z])(\d+)$", s).groups()
-  r = ord(r) - ord('a')
-  c = int(c) - 1
-  return (r, c)
+  if len(s) < 2 or not 'a' <= s[0] <= 'z' or not s[1:].isdigit():
+    raise Exception("Expecting chess square, got '" + s + "'")
+  return locationAt(ord(s[0]) - _ORD_A, int(s[1:]) - 1)
 
 def parseRect(rect):
   """ Given a pair of chess-style squares,
@@ -34,11 +58,8 @@ def parseRect(rect):
   (startRow, startCol) = parseSquare(first)
   (endRow, endCol) = parseSquare(last)
 
-  result = []
-  for r in range(startRow, endRow + 1):
-    for c in range(startCol, endCol + 1):
-      result.append((r, c))
-  return result
+  cells = itertools.product(range(startRow, endRow + 1), range(startCol, endCol + 1))
+  return [locationAt(r, c) for (r, c) in cells]
 
 def parseList(chess):
   """ Convert a string containing a comma-separated list of chess-style squares and rectangles 
@@ -53,13 +74,15 @@ def parseList(chess):
       [(0, 0), (1, 0), (1, 1), (2, 1)]
       >>> parseList('d3')
       [(3, 2)]
+      >>> parseList('a1,a2\tb1 ,, b2')
+      [(0, 0), (0, 1), (1, 0), (1, 1)]
   """
   result = []
-  for c in chess.split(' '):
-    c = c.strip(' ,')
+  # Commas and any whitespace separate squares; split() drops the empty tokens.
+  for c in chess.replace(',', ' ').split():
     if '-' in c:
       result.extend(parseRect(c))
-    elif len(c):
+    else:
       result.append(parseSquare(c))
   return result
 
@@ -70,11 +93,16 @@ def location(location):
   """
   if not isinstance(location, (list, tuple)) or not isinstance(location[0], int):
     raise Exception("Expecting location, got '" + str(location) + "'")
-  return chr(ord('a') + location[0]) + str(location[1] + 1)
+  return _squareName(location[0], location[1])
+
+@functools.lru_cache(maxsize=None)
+def _squareName(row, col):
+  """ The chess-style name of the square at the given coordinates, for location(). """
+  return chr(_ORD_A + row) + str(col + 1)
 
 def locations(locations):
   """ Given a list of zero-relative coordinate pairs, return a string listing chess-style squares.
       >>> locations([(0, 0), (0, 1)])
       '[a1 a2]'
   """
-  return '[' + ' '.join([location(loc) for loc in locations]) + ']'
\ No newline at end of file
+  return '[' + ' '.join(map(location, locations)) + ']'
\ No newline at end of file
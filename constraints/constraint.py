@@ -19,6 +19,8 @@ class Constraint:
       do nothing and say it's unfinished, rather than consider
       it an error.
   """
+  _techniques = None  # the result of techniques(), cached by apply()
+
   def __init__(self, **kwargs):
     pass
 
@@ -37,11 +39,14 @@ class Constraint:
         If you have any techniques() defined, applies those and keeps this constraint,
         unless a technique returns a list, then returns that.
     """
-    # Wait until we've initialized the solution and symbol set.
-    if self.techniques():
+    if self._techniques is None:
+      self._techniques = self.techniques()
+    techniques = self._techniques
+    if techniques:
+      # Wait until we've initialized the solution and symbol set.
       if puzzle.solution and puzzle.symbols:
         # Apply all the techniques, stopping when one has results.
-        for technique in self.techniques():
+        for technique in techniques:
           result = technique(puzzle)
           if result is not None:
             return result
@@ -51,9 +56,23 @@ class Constraint:
       # No techniques, so just eliminate this constraint.
       return []
 
+  def waitForSize(self, puzzle):
+    """ For constraints that can't do anything until the puzzle's size is known:
+        return this from apply() instead of [self].
+        The constraint is set aside, and added back to the puzzle when the size is set,
+        rather than being re-applied on every pass in the meantime.
+    """
+    puzzle.onSizeKnown(self.resume)
+    return []
+
+  def resume(self, puzzle):
+    """ Add this constraint back to the puzzle, after waitForSize(). """
+    puzzle.constraints.append(self)
+
   def techniques(self):
     """ Return a list of functions to be called, in order,
         when the puzzle has a solution and symbols.
         Override this in derived classes to append more techniques.
+        It's called once per constraint, and the list is reused on every apply().
     """
     return []
@@ -13,17 +13,9 @@ def differenceF(x, y):
 def quotientF(x, y):
   return x / y
 
-def hashInts(ints):
-  """ Return a hashable that uniquely represents a list of integers.
-      >>> hashInts([1, 2, 5])
-      '1_2_5'
-      >>> hashInts([2])
-      '2'
-  """
-  return '_'.join([str(x) for x in ints])
-
-def factorizations(n, m):
+def factorizations(n, m, maxFactor=None):
   """ Yield each combination of ways to multiply m integers to make n.
+      If maxFactor is given, only combinations whose factors are all at most maxFactor are included.
       >>> list(factorizations(1, 1))
       [[1]]
       >>> list(factorizations(2, 1))
@@ -34,23 +26,37 @@ def factorizations(n, m):
       [[1, 4], [2, 2]]
       >>> list(factorizations(50, 3))
       [[1, 1, 50], [1, 2, 25], [1, 5, 10], [2, 5, 5]]
+      >>> list(factorizations(50, 3, 9))
+      [[2, 5, 5]]
+  """
+  for combo in _factorizations(n, m, 1, maxFactor):
+    yield list(combo)
+
+@functools.lru_cache(maxsize=None)
+def _factorizations(n, m, minFactor=1, maxFactor=None):
+  """ Memoized worker for factorizations(), returning a tuple of sorted tuples.
+      Shared by all ProductIs constraints, and by its own recursion.
+      Factors are generated in non-decreasing order, starting at minFactor,
+      so each combination comes out exactly once, already sorted.
+      Bounding the factors by maxFactor prunes whole branches of the search.
+      >>> _factorizations(12, 2, 3)
+      ((3, 4),)
+      >>> _factorizations(1, 2, 2)
+      ()
   """
   if n == 1:
-    yield m * [1]
+    return (m * (1,),) if minFactor <= 1 else ()
+  elif maxFactor is not None and n > maxFactor ** m:
+    return ()
   elif m == 1:
-    yield [n]
+    return ((n,),) if n >= minFactor else ()
 
-  # Pull off every even factor we can.
-  else:
-    # Filter out repeats.
-    seen = set()
-    for i in range(1, n + 1):
-      if n % i == 0:
-        remainder = n // i
-        for rest in factorizations(remainder, m - 1):
-          combo = sorted([i] + rest)
-          # Yield combo, but only if we haven't yet.
-          h = hashInts(combo)
-          if h not in seen:
-            seen.add(h)
-            yield combo
+  # The smallest factor can't exceed the m'th root of n.
+  result = []
+  i = minFactor
+  while i ** m <= n and (maxFactor is None or i <= maxFactor):
+    if n % i == 0:
+      for rest in _factorizations(n // i, m - 1, i, maxFactor):
+        result.append((i,) + rest)
+    i += 1
+  return tuple(result)
@@ -1,3 +1,4 @@
+import collections
 
 def subtractLists(alist, blist):
   """ Return list a with all elements that match an element in b removed.
@@ -8,8 +9,12 @@ def subtractLists(alist, blist):
       >>> subtractLists([[0, 0], [0, 1]], [[0, 0]])
       [[0, 1]]
   """
-  return [a for a in alist if not a in blist]
-  # return filter(alist, lambda a: a not in blist)
+  try:
+    bset = set(blist)
+    return [a for a in alist if not a in bset]
+  except TypeError:
+    # Unhashable elements: fall back to comparing against the list.
+    return [a for a in alist if not a in blist]
 
 def subtractListsUnique(alist, blist):
   """ Return list a with all elements that match an element in b removed.
@@ -24,10 +29,28 @@ def subtractListsUnique(alist, blist):
       ['2', '3']
       >>> list(subtractListsUnique([[0, 0], [0, 0], [0, 1]], [[0, 0]]))
       [[0, 0], [0, 1]]
+      >>> list(subtractListsUnique([[0, 0], [0, 1]], []))
+      [[0, 0], [0, 1]]
+      >>> list(subtractListsUnique([1, [0]], [1]))
+      [[0]]
   """
-  blist = list(blist[:])  # copy so as not to modify original
+  alist = list(alist)
+  try:
+    counts = collections.Counter(blist)
+    for a in alist:
+      hash(a)  # check before yielding anything, so the fallback can start from the beginning
+  except TypeError:
+    # Unhashable elements in either list: fall back to removing from a copy of the list.
+    blist = list(blist[:])  # copy so as not to modify original
+    for a in alist:
+      if a in blist:
+        blist.remove(a)
+      else:
+        yield a
+    return
+
   for a in alist:
-    if a in blist:
-      blist.remove(a)
+    if counts[a]:
+      counts[a] -= 1
     else:
       yield a
@@ -1,7 +1,7 @@
-import copy
+import functools
+import itertools
 import logging
 import math
-import re
 
 from . import chess
 from .factoring import *
@@ -18,7 +18,8 @@ class SymbolsNumericDigits(Constraint):
     self.max_digits = max_digits
 
   def apply(self, puzzle):
-    puzzle.symbols = SymbolSet([str(x) for x in range(1, self.max_digits + 1)])
+    puzzle.symbolValues = _digitValues(self.max_digits)
+    puzzle.symbols = _symbolSetFor(tuple(range(1, self.max_digits + 1)))
     logging.debug("Setting symbols to %s", puzzle.symbols)
     return []
 
@@ -34,7 +35,7 @@ class SymbolsNumericByDiameter(Constraint):
       return [SymbolsNumericDigits(puzzle.size[0])]
     else:
       # We can finish later, whenever the size is known.
-      return [self]
+      return self.waitForSize(puzzle)
 
 class MathOp(RegionConstraint):
   """ Applies a math operator to the values of symbols in a region,
@@ -48,6 +49,8 @@ class MathOp(RegionConstraint):
     self.inverseName = inverseName
     self.target = target
     self.isCommutative = isCommutative
+    self.inverseMasks = None  # built by inverseMaskTable()
+    self.knownCheckedAt = None  # (solution, changeCount) when removeKnown last found nothing to do
 
   def __str__(self):
     return super().__str__() + ': '+ self.region.display(self.operatorName, brackets=False) + ' = ' + str(self.target)
@@ -59,11 +62,13 @@ class MathOp(RegionConstraint):
     """ Technique to set the target value as a symbol if the region contains only one cell. """
     if puzzle.symbols and puzzle.solution:
       if self.region.size() == 1:
-        logging.debug("Single value: %s has a target value of %s",
-          chess.location(self.region.cells[0]), self.target)
-        assert str(self.target) in puzzle.symbols
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+          logging.debug("Single value: %s has a target value of %s",
+            chess.location(self.region.cells[0]), self.target)
+        symbol = str(self.target)
+        assert symbol in puzzle.symbols
         puzzle.logTechnique('singleValue')
-        puzzle.solution.setCell(self.region.cells[0], str(self.target))
+        puzzle.solution.setCell(self.region.cells[0], symbol)
         return []
 
   def removeKnown(self, puzzle):
@@ -71,30 +76,38 @@ class MathOp(RegionConstraint):
         and generate a new constraint that adjusts the target appropriately.
     """
     if puzzle.solution and puzzle.symbols:
+      checked = (puzzle.solution, puzzle.solution.changeCount)
+      if self.knownCheckedAt == checked:
+        # Nothing in the solution has changed since we last looked.
+        return
       for location in self.region:
         cell = puzzle.solution.at(location)
         if len(cell) == 1 and cell.value() != '*':
-          value = int(cell.value())
-          inverses = self.inverseSet(value)
-          inverses.intersection_update(puzzle.symbols)
+          value = puzzle.symbolValues[cell.value()]
+          inverses = SymbolSet(self.inverseSet(value) & puzzle.symbols)
+          if len(inverses) != 1 and self.region.size() != 2:
+            continue
+          rest = self.region.subtract([location])
 
           if len(inverses) == 1:
             # Only one possible target value, so make a new constraint to target that.
-            new = copy.copy(self)
-            new.target = int(inverses.value())
-            new.region = self.region.subtract([location])
-            logging.debug("Remove known: since %s and %s = %s, make %s",
-              self, chess.location(location), value, new)
-            puzzle.logTechnique('removeKnown')
-            return [new]
-          elif self.region.size() == 2:
+            new = self.reduced(rest, int(inverses.value()))
+          else:
             # There are now two possibilities for the remaining cell.
             # Make a RegionSymbolsConstraint for that, and eliminate values.
-            new = RegionSymbolsConstraint(self.region.subtract([location]), inverses)
+            new = RegionSymbolsConstraint(rest, inverses)
+          if logging.getLogger().isEnabledFor(logging.DEBUG):
             logging.debug("Remove known: since %s and %s = %s, make %s",
               self, chess.location(location), value, new)
-            puzzle.logTechnique('removeKnown')
-            return [new]
+          puzzle.logTechnique('removeKnown')
+          return [new]
+      self.knownCheckedAt = checked
+
+  def reduced(self, region, target):
+    """ Return a new constraint of the same kind, over the given (smaller) region with a new target.
+        Assumes the subclass constructor takes (region, target), as all the specific operators do.
+    """
+    return type(self)(region, target)
 
   def inverseList(self, value, target=None):
     """ Apply the inverse operator to target and value and return the resulting list of numeric values.
@@ -104,37 +117,71 @@ class MathOp(RegionConstraint):
     """
     if target is None:
       target = self.target
-    result = [self.inverse(target, value)]
+    return self.inverseValues(value, target)
+
+  def inverseValues(self, value, target):
+    """ The same as inverseList(), but the target is required.
+        Subclasses with a known operator override this with the arithmetic inlined.
+    """
+    # Round each result once, keeping it only if it was already an integer.
+    result = []
+    x = self.inverse(target, value)
+    rx = round(x)
+    if rx == x:
+      result.append(rx)
     if not self.isCommutative:
-      result.append(self.operator(value, target))
-    result = filter(lambda x: x == round(x), result)  # eliminate non-integers
+      y = self.operator(value, target)
+      ry = round(y)
+      if ry == y:
+        result.append(ry)
     return result
 
   def inverseSet(self, value):
     """ Apply the inverse operator to target and value and return the resulting symbol set.
         Remove non-integer values from the result.
         One or two values may be produced.
+        The result is cached and shared, so don't modify it.
+    """
+    return _inverseSet(self.inverseValues, value, self.target)
+
+  def inverseMaskTable(self, puzzle):
+    """ Return a list indexed by each symbol value, holding the same values as inverseSet()
+        as a bitmask with bit n set for the value n.
+        The target never changes, so the table is built the first time it's needed.
     """
-    return SymbolSet([str(round(x)) for x in self.inverseList(value)])
+    if self.inverseMasks is None:
+      table = [0] * (max(puzzle.symbolValues.values()) + 1)
+      for x in puzzle.symbolValues.values():
+        for y in self.inverseValues(x, self.target):
+          if y >= 0:
+            table[x] |= 1 << y
+      self.inverseMasks = table
+    return self.inverseMasks
 
   def checkPair(self, puzzle, locations):
     """ Check the ordered pair at the first two of the given list of locations.
         Eliminate values from the first if the inverse operation doesn't produce 
         a valid result in the second.        
     """
+    values = puzzle.symbolValues
+    inverseMasks = self.inverseMaskTable(puzzle)
     cells = list(map(puzzle.solution.at, locations))
+    secondMask = _valueMask(cells[1], values)
+    eliminated = []
     for xs in cells[0]:
-      x = int(xs)
-      y = self.inverseSet(x)
-
-      if not (y & cells[1]):
-        puzzle.solution.eliminateAt(locations[0], xs)
-        logging.debug("Operator: Because %s and %s%s%s = %s, which isn't in %s, %s can't be in %s", 
-          self, 
-          self.target, self.inverseName, xs, y,
-          cells[1],
-          xs, chess.location(locations[0]))
+      x = values[xs]
+
+      if not inverseMasks[x] & secondMask:
+        eliminated.append(xs)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+          logging.debug("Operator: Because %s and %s%s%s = %s, which isn't in %s, %s can't be in %s", 
+            self, 
+            self.target, self.inverseName, xs, self.inverseSet(x),
+            cells[1],
+            xs, chess.location(locations[0]))
         puzzle.logTechnique('twoCellOperator')
+    if eliminated:
+      puzzle.solution.eliminateAt(locations[0], eliminated)
 
   def twoCellOperator(self, puzzle):
     """ If the region has two cells, we can run through all possible pairs of values, 
@@ -149,29 +196,25 @@ class MathOp(RegionConstraint):
     """ Return True if there's an allowed set of values in locations
         that will accumulate to the target value using our current operator.
     """
-    if not locations:
-      return False
-    firstCell = puzzle.solution.at(locations[0])
-    if len(locations) == 1:
-      return str(round(target)) in firstCell
-    else:
-      # Peel off the first location and recurse.
-      restLocations = locations[1:]
-      for xs in firstCell:
-        x = int(xs)
-        y = self.inverseList(x, target)
-        if self.canMakeAnyTarget(puzzle, y, restLocations):
-          return True
-      return False
+    return self.canMakeAnyTarget(puzzle, [target], locations)
 
   def canMakeAnyTarget(self, puzzle, targets, locations):
     """ Return True if there is an allowed set of values in locations
         that will accumulate to a value in targets using our current operator.
+        Works forward through the locations, keeping the set of targets
+        that the remaining locations would have to make.
     """
-    for target in targets:
-      if self.canMakeTarget(puzzle, target, locations):
-        return True
-    return False
+    if not locations:
+      return False
+    values = puzzle.symbolValues
+    targets = set(targets)
+    for location in locations[:-1]:
+      cell = puzzle.solution.at(location)
+      targets = {y for target in targets for xs in cell for y in self.inverseValues(values[xs], target)}
+      if not targets:
+        return False
+    lastCell = puzzle.solution.at(locations[-1])
+    return any(str(round(target)) in lastCell for target in targets)
 
   def checkVersusRest(self, puzzle, location, restLocations):
     """ Enumerate all possible values for the solution at the given location.
@@ -180,16 +223,20 @@ class MathOp(RegionConstraint):
         eliminate that value from the location.
     """
     cell = puzzle.solution.at(location)
+    eliminated = []
     for xs in cell:
-      x = int(xs)
+      x = puzzle.symbolValues[xs]
       y = self.inverseList(x)
       if not self.canMakeAnyTarget(puzzle, y, restLocations):
-        logging.debug("Operator: Can't satisfy %s with %s in %s, so eliminating it", 
-          self,
-          xs,
-          chess.location(location))
-        puzzle.solution.eliminateAt(location, xs)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+          logging.debug("Operator: Can't satisfy %s with %s in %s, so eliminating it", 
+            self,
+            xs,
+            chess.location(location))
+        eliminated.append(xs)
         puzzle.logTechnique('regionOperator')
+    if eliminated:
+      puzzle.solution.eliminateAt(location, eliminated)
 
   def regionOperator(self, puzzle):
     """ Enumerate all possible lists of values for all cells in the region that would satisfy the operator,
@@ -197,35 +244,106 @@ class MathOp(RegionConstraint):
         and eliminate the values that won't work.
     """
     if puzzle.symbols and puzzle.solution and puzzle.solution.isInitializedThroughout(self.region):
-      for i in range(self.region.size()):
-        restLocations = self.region.cells.copy()
-        del restLocations[i]
-        self.checkVersusRest(puzzle, self.region.cells[i], restLocations)
+      cells = self.region.cells
+      for i in range(len(cells)):
+        self.checkVersusRest(puzzle, cells[i], cells[:i] + cells[i+1:])
+
+@functools.lru_cache(maxsize=None)
+def _inverseSet(inverseValues, value, target):
+  """ The symbol set for MathOp.inverseSet(), shared by all constraints with the same inverseValues(). """
+  return _symbolSetFor(tuple(sorted(set(inverseValues(value, target)))))
+
+def _valueMask(cell, values):
+  """ Return a bitmask with bit n set for each symbol in cell whose value is n.
+      >>> bin(_valueMask(['1', '3'], {'1': 1, '3': 3}))
+      '0b1010'
+  """
+  mask = 0
+  for xs in cell:
+    mask |= 1 << values[xs]
+  return mask
+
+@functools.lru_cache(maxsize=None)
+def _factorSymbolLists(target, size, symbols):
+  """ Return a tuple of the symbol lists for ProductIs.primeFactors(): each way to multiply
+      size of the given frozenset of numeric symbols to make target.
+      >>> _factorSymbolLists(12, 2, frozenset('123456'))
+      (('2', '6'), ('3', '4'))
+      >>> _factorSymbolLists(12, 2, frozenset('12356'))
+      (('2', '6'),)
+  """
+  # Step through all combinations of the factors of the target.
+  values = [int(s) for s in symbols]
+  symbolMask = sum(1 << x for x in values)
+  result = []
+  for factors in factorizations(target, size, max(values)):
+    factorMask = 0
+    for f in factors:
+      factorMask |= 1 << f
+    # Include a factorization only if all its factors are valid symbols in the puzzle.
+    if not factorMask & ~symbolMask:
+      result.append(tuple(str(f) for f in factors))
+  return tuple(result)
+
+@functools.lru_cache(maxsize=None)
+def _digitValues(maxDigit):
+  """ Return a dict mapping the symbols '1' through maxDigit to their values.
+      Shared by every puzzle with the same number of digits, so don't modify it.
+  """
+  return {str(x): x for x in range(1, maxDigit + 1)}
+
+@functools.lru_cache(maxsize=None)
+def _symbolSetFor(values):
+  """ Return a SymbolSet for the given sorted tuple of integers.
+      The same set is shared by every caller with the same values, so don't modify it.
+      >>> _symbolSetFor((1, 2)) is _symbolSetFor((1, 2))
+      True
+  """
+  return SymbolSet([str(x) for x in values])
+
+def _addToSums(sums, cell, values, mask):
+  """ Given a bitmask of reachable totals, return the bitmask of totals
+      reachable by adding any symbol in cell, limited to the given mask.
+      >>> bin(_addToSums(0b11, ['1', '3'], {'1': 1, '3': 3}, 0b11111))
+      '0b11110'
+  """
+  result = 0
+  for xs in cell:
+    result |= sums << values[xs]
+  return result & mask
+
+def _bits(n):
+  """ Yield the positions of the bits set in n.
+      >>> list(_bits(0b10110))
+      [1, 2, 4]
+  """
+  while n:
+    low = n & -n
+    yield low.bit_length() - 1
+    n ^= low
 
 class Math(MathOp):
   """ Convenience for more compact typing in input YAML.
       >>> print(Math("a1+a2+a3 = 6").apply(None)[0])
       SumIs: a1+a2+a3 = 6
+      >>> print(Math("b2 x c2 = 12").apply(None)[0])
+      ProductIs: b2*c2 = 12
+      >>> print(Math("d1 = 7").apply(None)[0])
+      SumIs: d1 = 7
   """
   def __init__(self, initializer):
     leftside, rightside = initializer.split('=')
-    try:
-      operator = re.search('[+-/*x]', leftside).group()
-    except:
-      operator = '+'  # todo: more error checking - this is for "d1 = 7" e.g.
-    squares = leftside.split(operator)
+    # The first operator character names the operator.
+    # todo: more error checking - defaulting to '+' is for "d1 = 7" e.g.
+    operator = next((ch for ch in leftside if ch in _OPERATOR_CLASSES), '+')
+    squares = [square.strip() for square in leftside.split(operator)]
     super().__init__(squares, None, operator, None, None, int(rightside.strip()))
 
   def apply(self, puzzle):
     """ Chain to the appropriate specific operator class. """
-    if self.operatorName == '+':
-      return [SumIs(self.region, self.target)]
-    if self.operatorName == '-':
-      return [DifferenceIs(self.region, self.target)]
-    if self.operatorName == '/':
-      return [QuotientIs(self.region, self.target)]
-    if self.operatorName in '*x':
-      return [ProductIs(self.region, self.target)]
+    operatorClass = _OPERATOR_CLASSES.get(self.operatorName)
+    if operatorClass:
+      return [operatorClass(self.region, self.target)]
     else:
       return []
 
@@ -234,17 +352,84 @@ class SumIs(MathOp):
   def __init__(self, region, target):
     super().__init__(region, sumF, '+', differenceF, '-', target)
 
+  @staticmethod
+  def inverseValues(value, target):
+    return [target - value]
+
+  def regionOperator(self, puzzle):
+    """ The same technique as MathOp.regionOperator, but for sums we can track
+        all the totals reachable by a run of cells at once, as a bitmask
+        where bit n is set if the cells can add up to n.
+        A negative target can't be a bitmask, so that goes through the general method
+        (which finds that nothing can make it).
+          >>> from puzzle import Puzzle
+          >>> p = Puzzle()
+          >>> p.addConstraints(['SymbolsNumericByDiameter', 'AllCellsMustHaveMathOp', {'size': [2, 2]},
+          ...   'a1+a2 = -2', 'b1+b2 = 3'])
+          >>> p.solve()
+          False
+          >>> p.isUnsolvable()
+          True
+    """
+    if self.target < 0:
+      return super().regionOperator(puzzle)
+    if puzzle.symbols and puzzle.solution and puzzle.solution.isInitializedThroughout(self.region):
+      values = puzzle.symbolValues
+      mask = (1 << (self.target + 1)) - 1
+      cells = [puzzle.solution.at(location) for location in self.region]
+
+      # after[i] holds the totals reachable by the cells after cell i.
+      after = [1]
+      for cell in reversed(cells[1:]):
+        after.append(_addToSums(after[-1], cell, values, mask))
+      after.reverse()
+
+      before = 1  # the totals reachable by the cells before the current one
+      for i, location in enumerate(self.region):
+        # Combine the totals on either side of this cell.
+        others = 0
+        for total in _bits(before):
+          others |= after[i] << total
+        eliminated = []
+        for xs in cells[i]:
+          x = values[xs]
+          if x > self.target or not (others >> (self.target - x)) & 1:
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+              logging.debug("Operator: Can't satisfy %s with %s in %s, so eliminating it",
+                self,
+                xs,
+                chess.location(location))
+            eliminated.append(xs)
+            puzzle.logTechnique('regionOperator')
+        if eliminated:
+          puzzle.solution.eliminateAt(location, eliminated)
+        before = _addToSums(before, puzzle.solution.at(location), values, mask)
+
 class DifferenceIs(MathOp):
   """ A MathOp for subtraction. """
   def __init__(self, region, target):
     super().__init__(region, differenceF, '-', sumF, '+', target, isCommutative=False)
 
+  @staticmethod
+  def inverseValues(value, target):
+    return [target + value, value - target]
+
 class ProductIs(MathOp):
   """ A MathOp for multiplication. """
   def __init__(self, region, target):
     super().__init__(region, productF, '*', quotientF, '/', target)
     self.factored = False
 
+  @staticmethod
+  def inverseValues(value, target):
+    return [] if target % value else [target // value]
+
+  def reduced(self, region, target):
+    """ Carry over whether we've already factored, so that's still done only once. """
+    new = super().reduced(region, target)
+    new.factored = self.factored
+    return new
+
   def techniques(self):
     return super().techniques() + [self.primeFactors]
 
@@ -254,16 +439,7 @@ class ProductIs(MathOp):
         Do this just one time for this constraint.
     """
     if puzzle.symbols and puzzle.solution and not self.factored:
-      # Step through all combinations of the factors of the target.
-      allSymbols = SymbolSet()
-      allSymbolLists = []
-      for factors in factorizations(self.target, self.region.size()):
-        factorSymbolList = [str(f) for f in factors]
-        factorSet = SymbolSet(factorSymbolList)
-        # Include a factorization only if all its factors are valid symbols in the puzzle.
-        if factorSet <= puzzle.symbols:
-          allSymbolLists.append(factorSymbolList)
-          allSymbols.update(factorSet)
+      allSymbolLists = _factorSymbolLists(self.target, self.region.size(), frozenset(puzzle.symbols))
 
       # Generate a RegionSymbolLists constraint
       new = RegionSymbolLists(self.region, allSymbolLists)
@@ -277,6 +453,19 @@ class QuotientIs(MathOp):
   def __init__(self, region, target):
     super().__init__(region, quotientF, '/', productF, '*', target, isCommutative=False)
 
+  @staticmethod
+  def inverseValues(value, target):
+    return [target * value] + ([] if value % target else [value // target])
+
+# Maps each operator character in a Math initializer to its MathOp class.
+_OPERATOR_CLASSES = {
+  '+': SumIs,
+  '-': DifferenceIs,
+  '/': QuotientIs,
+  '*': ProductIs,
+  'x': ProductIs,
+}
+
 class AllCellsMustHaveMathOp(Constraint):
   """ Require that every cell in the puzzle be included in a MathOp constraint's region.
       Also creates the initial placement, when the size is known, as an array of '*'.
@@ -286,24 +475,23 @@ class AllCellsMustHaveMathOp(Constraint):
       # Create the initial placement.
       if not puzzle.initial:
         logging.debug("Setting initial state to blank")
-        puzzle.setInitial([puzzle.size[1] * '*' for i in range(puzzle.size[0])])
+        puzzle.setBlankInitial()
       else:
         logging.debug("About to set initial state, but it's already:\n%s", puzzle.initial)
 
       # Find out if any squares are uncovered.
-      for row in range(0, puzzle.size[0]):
-        for col in range(0, puzzle.size[1]):
-          if not self.inMathOp(puzzle, (row, col)):
-            raise Exception("The cell " + chess.location((row, col)) + " doesn't have a MathOp constraint.")
+      covered = self.coveredCells(puzzle)
+      for location in itertools.product(range(puzzle.size[0]), range(puzzle.size[1])):
+        if location not in covered:
+          raise Exception("The cell " + chess.location(location) + " doesn't have a MathOp constraint.")
 
       return []  # finished
     else:
-      return [self]  # wait for size
-
-  def inMathOp(self, puzzle, location):
-    """ Return True iff the puzzle has a MathOp constraint that includes the given location in its Region. """
-    for c in puzzle.constraints:
-      if isinstance(c, MathOp):
-        if c.contains(location):
-          return True
-    return False
\ No newline at end of file
+      return self.waitForSize(puzzle)
+
+  def coveredCells(self, puzzle):
+    """ Return the set of locations included in the Region of any of the puzzle's MathOp constraints. """
+    covered = set()
+    for c in puzzle.constraintsOfType(MathOp):
+      covered.update(c.region)
+    return covered
@@ -2,8 +2,7 @@ import logging
 
 from . import chess
 from .constraint import Constraint
-from .region import Region, RegionSymbolsConstraint, subtractLists
-from .symbolSet import SymbolSet
+from .region import Region, RegionSymbolsConstraint
 
 class RegionPermutesSymbols(RegionSymbolsConstraint):
   """ The core logic for regions containing each symbol in a set,
@@ -39,32 +38,33 @@ class RegionPermutesSymbols(RegionSymbolsConstraint):
         - the "limited" region that contains those n cells and symbols, and
         - the "remainder" region that contains the other cells and the other symbols.
         For n = 1, this takes care of removing "settled" symbols from the remainder of the region.
-        Returns constraints for those two regions as soon as the condition is found.
-        (That may not be the most efficient option, but it does simplify the logic.)
+        Returns constraints for those two regions as soon as the condition is found,
+        without looking at the rest of the region.
     """
-    # First, index the contents.
-    index = {}  # maps a set of symbols to the coordinates at which they appear.
+    index = {}  # maps a (frozen) set of symbols to the coordinates at which they appear.
+    at = puzzle.solution.at
+    symbolCount = len(self.symbols)
     for location in self.region:
-      subset = puzzle.solution.at(location)
-      if len(subset) < len(self.symbols):
-        symbolsKey = '|'.join(subset)
-        index.setdefault(symbolsKey, []).append(location)
-
-    for symbols, coordList in index.items():
-      subset = SymbolSet(symbols.split('|'))
-      if len(subset) == len(coordList):
-        # There are the same number of symbols in this subset as cells to put them in.
-        # So, the given coordList can be partitioned off from the rest of the region.
-        remainder = self.remainder(coordList, subset)
-        logging.debug("Partitioning out %s in %s, leaving %s in %s", 
-          subset, chess.locations(coordList), remainder.symbols, remainder.region)
-        puzzle.logTechnique('partition')
-        result = [RegionPermutesSymbols(coordList, subset), remainder]
-
-        # We can also remove all the subset symbols from the remainder region.
-        puzzle.solution.eliminateThroughout(remainder.region, subset)
-
-        return result
+      subset = at(location)
+      if len(subset) < symbolCount:
+        coordList = index.setdefault(frozenset(subset), [])
+        coordList.append(location)
+        if len(coordList) == len(subset):
+          # There are the same number of symbols in this subset as cells to put them in.
+          # So, the given coordList can be partitioned off from the rest of the region.
+          # (If any later cell also holds just these symbols, eliminating them from it
+          # leaves it empty, so the contradiction still shows up.)
+          remainder = self.remainder(coordList, subset)
+          if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("Partitioning out %s in %s, leaving %s in %s", 
+              subset, chess.locations(coordList), remainder.symbols, remainder.region)
+          puzzle.logTechnique('partition')
+          result = [RegionPermutesSymbols(coordList, subset), remainder]
+
+          # We can also remove all the subset symbols from the remainder region.
+          puzzle.solution.eliminateThroughout(remainder.region, subset)
+
+          return result
 
   def misfit(self, puzzle):
     """ Look for a symbol that only occurs in one place within the region.
@@ -80,8 +80,9 @@ class RegionPermutesSymbols(RegionSymbolsConstraint):
       if len(locations) == 1:
         puzzle.solution.setCell(locations[0], s)
         remainder = self.remainder(locations, [s])
-        logging.debug("Misfit: %s must be %s, since it can't occur elsewhere in %s",
-          chess.location(locations[0]), s, self.region)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+          logging.debug("Misfit: %s must be %s, since it can't occur elsewhere in %s",
+            chess.location(locations[0]), s, self.region)
         puzzle.logTechnique('misfit')
         return [remainder]
 
@@ -91,15 +92,14 @@ class RegionPermutesSymbols(RegionSymbolsConstraint):
         Then we can replace this constraint with a new one that doesn't include that region or its symbols.
         Returns a list containing the new constraint, or None if no such constraints were found.
     """
-    for constraint in puzzle.constraints:
-      if isinstance(constraint, RegionPermutesSymbols):
-        if self.region.hasProperSubset(constraint.region):
-          remainder = self.remainderConstraint(constraint)
-          logging.debug("Borrowing %s from %s, leaving %s in %s", 
-            constraint.symbols, constraint.region, remainder.symbols, remainder.region)
-          puzzle.logTechnique('borrow')
-          puzzle.solution.eliminateThroughout(remainder.region, constraint.symbols)
-          return [remainder]
+    for constraint in puzzle.constraintsSharingCells(RegionPermutesSymbols, self.region):
+      if self.region.hasProperSubset(constraint.region):
+        remainder = self.remainderConstraint(constraint)
+        logging.debug("Borrowing %s from %s, leaving %s in %s", 
+          constraint.symbols, constraint.region, remainder.symbols, remainder.region)
+        puzzle.logTechnique('borrow')
+        puzzle.solution.eliminateThroughout(remainder.region, constraint.symbols)
+        return [remainder]
 
   def intersection(self, puzzle):
     """ Look for another permutation constraint whose region intersects with this one.
@@ -107,8 +107,8 @@ class RegionPermutesSymbols(RegionSymbolsConstraint):
         that means they have to occur in that intersection,
         so they can be removed from the remainder of the cells in this region.
     """
-    for constraint in puzzle.constraints:
-      if isinstance(constraint, RegionPermutesSymbols) and constraint is not self:
+    for constraint in puzzle.constraintsSharingCells(RegionPermutesSymbols, self.region):
+      if constraint is not self:
         intersection = self.region.intersect(constraint.region)
         if not intersection.isEmpty() and intersection.size() < self.region.size():
           index = puzzle.solution.indexSymbolsIn(constraint.region)
@@ -117,8 +117,9 @@ class RegionPermutesSymbols(RegionSymbolsConstraint):
             if intersection.hasSubset(locations):
               remainder = self.region.subtract(intersection)
               if puzzle.solution.eliminateThroughout(remainder, [s]):
-                logging.debug("Intersection from %s: %s occurs only in %s, so remove it from %s",
-                  constraint.region, s, intersection, chess.locations(remainder))
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                  logging.debug("Intersection from %s: %s occurs only in %s, so remove it from %s",
+                    constraint.region, s, intersection, chess.locations(remainder))
                 puzzle.logTechnique('intersection')
 
   # Utility functions:
@@ -166,17 +167,16 @@ class RegionsAreCompletePermutation(Constraint):
 
 class EachDimensionIsCompletePermutation(Constraint):
   """ Creates a RegionsAreCompletePermutation constraint for each row and column.
-      Only works up to size 9.
+      Works for up to 26 rows, which is as far as chess notation goes.
   """
   def apply(self, puzzle):
     if puzzle.size:
-      lastRow = chr(ord('a') + puzzle.size[0] - 1)
-      lastCol = chr(ord('1') + puzzle.size[1] - 1)
+      (rows, cols) = puzzle.size
       # Rows: like "a1-a9", for a..i
-      regions = [chr(r) + '1-' + chr(r) + lastCol for r in range(ord('a'), ord(lastRow) + 1)]
+      regions = [chess.location((r, 0)) + '-' + chess.location((r, cols - 1)) for r in range(rows)]
       # Cols: like "a1-i1" for 1..9
-      regions += ['a' + chr(c) + '-' + lastRow + chr(c) for c in range(ord('1'), ord(lastCol) + 1)]
+      regions += [chess.location((0, c)) + '-' + chess.location((rows - 1, c)) for c in range(cols)]
       return [RegionsAreCompletePermutation(regions)]
     else:
       # Can't resolve without the size, so wait for it to be known.
-      return [self]
+      return self.waitForSize(puzzle)
@@ -1,13 +1,15 @@
-from functools import reduce
 import logging
-import operator
 
-from .listutils import subtractLists
 from .constraint import Constraint
 from .symbolSet import SymbolSet, SymbolList
 from . import chess
 
 class Region():
+  # Regions are built in large numbers, so they don't get a __dict__.
+  # results holds cached intersect() and subtract() results, by operation and the other Region's cells,
+  # and text is the cached result of str(), or None.
+  __slots__ = ('cells', 'cellSet', 'results', 'text')
+
   def __init__(self, region):
     """ Regions can be specified by a string of two chess-style coordinates separated by a dash,
         or as a list of 0-relative coordinate pairs,
@@ -28,35 +30,73 @@ class Region():
         '[]'
         >>> str(Region((1, 1)))
         '[a1]'
+        >>> str(Region([[0, 1], [1, 1]]))
+        '[a2 b2]'
     """
-    if isinstance(region, str):
+    if isinstance(region, Region):
+      # Copying another Region, which is the most common case: share everything.
+      self.cells = region.cells
+      self.cellSet = region.cellSet
+      self.results = region.results
+      self.text = region.text
+      return
+    elif isinstance(region, str):
       # Strings are parsed as chess notation.
       self.cells = chess.parseList(region)
     elif isinstance(region, (list, tuple)):
       if len(region) > 0 and isinstance(region[0], int):
         # Looks like a single set of coordinates.
-        self.cells = reduce(operator.concat, 
-          [[(r, c) for r in range(0, region[0])] for c in range(0, region[1])],
-          [])
+        self.cells = [chess.locationAt(r, c) for c in range(0, region[1]) for r in range(0, region[0])]
       elif len(region) > 0 and isinstance(region[0], str):
         # A list of strings: interpret individual elements as chess notation.
         self.cells = []
         for s in region:
           self.cells.extend(chess.parseList(s))
-      elif len(region) > 0 and isinstance(region[0], (list, tuple)) and len(region[0]) > 0 and isinstance(region[0][0], int):
+      elif len(region) > 0 and isinstance(region[0], tuple) and len(region[0]) > 0 and isinstance(region[0][0], int):
         # List of coordinate tuples.
         self.cells = region
+      elif len(region) > 0 and isinstance(region[0], list) and len(region[0]) > 0 and isinstance(region[0][0], int):
+        # List of coordinate lists: make them tuples, so they can be hashed.
+        self.cells = [chess.locationAt(*c) for c in region]
       elif len(region) == 0:
         self.cells = []
       else:
         raise Exception("Don't know how to create a Region from " + str(region))
-    elif isinstance(region, Region):
-      self.cells = region.cells
     else:
       raise Exception("Don't know how to create a Region from " + str(region))
+    self.cells = tuple(self.cells)  # never modified after this
+    self.cellSet = frozenset(self.cells)  # for fast membership tests; self.cells keeps the order
+    self.results = {}  # Regions never change, so these can be kept; shared by copies of this Region.
+    self.text = None
+
+  @classmethod
+  def fromCells(cls, cells):
+    """ Make a Region from an iterable of coordinate tuples,
+        skipping the format checks in the constructor.
+        >>> str(Region.fromCells([(0, 0), (1, 1)]))
+        '[a1 b2]'
+    """
+    result = cls.__new__(cls)
+    result.cells = tuple(cells)
+    result.cellSet = frozenset(result.cells)
+    result.results = {}
+    result.text = None
+    return result
+
+  def __deepcopy__(self, memo):
+    """ Regions never change once built, so copies of a puzzle can share them,
+        along with their cached results.
+        >>> import copy
+        >>> r = Region('a1-b2')
+        >>> copy.deepcopy(r) is r
+        True
+    """
+    return self
 
   def __str__(self):
-    return self.display()
+    if self.text is None:
+      self.text = self.display()
+    return self.text
 
   def display(self, sep=' ', brackets=True):
     """ Return a display string in chess notation, using the given separator between squares.
@@ -67,7 +107,7 @@ class Region():
         >>> Region([(0,0), (0,1)]).display(', ', brackets=False)
         'a1, a2'
     """
-    result = sep.join([chess.location(c) for c in self.cells])
+    result = sep.join(map(chess.location, self.cells))
     if brackets:
       result = '[' + result + ']'
     return result
@@ -77,8 +117,7 @@ class Region():
 
   def __iter__(self):
     """ Yield the coordinate tuples in the Region. """
-    for cell in self.cells:
-      yield cell
+    return iter(self.cells)
 
   def isEmpty(self):
     return len(self.cells) == 0
@@ -90,7 +129,7 @@ class Region():
         >>> Region('a1-b2').contains((1, 2))
         False
     """
-    return location in self.cells
+    return location in self.cellSet
 
   def hasSubset(self, other):
     """ Return True if all cells in the other Region (or list of locations)
@@ -101,10 +140,11 @@ class Region():
         >>> Region('a1-b2').hasSubset(Region('b3'))
         False
     """
-    for cell in other:
-      if not cell in self.cells:
+    if isinstance(other, Region):
+      if len(other.cells) > len(self.cells):
         return False
-    return True
+      return self.cellSet.issuperset(other.cellSet)
+    return self.cellSet.issuperset(other)
 
   def hasProperSubset(self, other):
     """ Return True if other is a subset of self, and it's also smaller.
@@ -116,27 +156,51 @@ class Region():
         >>> Region('a1-b2').hasProperSubset(Region('a1-b1'))
         True
     """
-    return len(other.cells) < len(self.cells) and self.hasSubset(other)
+    return self.cellSet > other.cellSet  # a proper superset, checked by the set itself
 
   def intersect(self, other):
     """ Return a Region that contains all cells that are in both self and other. 
+        The cells are in the order of the smaller of the two.
         >>> print(Region('a1-b2').intersect(Region('a1-a9')))
         [a1 a2]
+        >>> print(Region('b1 a2').intersect(Region('a1-b2')))
+        [b1 a2]
+        >>> r = Region('a1-b2')
+        >>> r.intersect(Region('a1-a9')) is r.intersect(Region('a1-a9'))
+        True
     """
-    return Region([cell for cell in other if cell in self.cells])
+    if isinstance(other, Region):
+      key = ('intersect', other.cellSet)
+      result = self.results.get(key)
+      if result is None:
+        if len(self.cells) < len(other.cells):
+          result = Region.fromCells([cell for cell in self.cells if cell in other.cellSet])
+        else:
+          result = Region.fromCells([cell for cell in other.cells if cell in self.cellSet])
+        self.results[key] = result
+      return result
+    return Region.fromCells([cell for cell in other if cell in self.cellSet])
 
   def subtract(self, other):
     """ Return a Region that contains all cells in self that aren't in other.
         >>> print(Region('a1-b2').subtract(Region('a1 c5')))
         [a2 b1 b2]
     """
-    return Region([cell for cell in self if not cell in other])
+    if isinstance(other, Region):
+      key = ('subtract', other.cellSet)
+      result = self.results.get(key)
+      if result is None:
+        result = self.results[key] = Region.fromCells([cell for cell in self.cells if not cell in other.cellSet])
+      return result
+    others = set(other)
+    return Region.fromCells([cell for cell in self.cells if not cell in others])
 
 class RegionConstraint(Constraint):
   """ A Constraint that is applied over a Region. """
   def __init__(self, region):
     super().__init__()
-    self.region = Region(region)
+    # Regions never change, so an existing one can be used as is.
+    self.region = region if isinstance(region, Region) else Region(region)
 
   def contains(self, location):
     return self.region.contains(location)
@@ -154,12 +218,20 @@ class RegionSymbolsConstraint(RegionConstraint):
   """ A RegionConstraint that knows a subset of the puzzle's symbols
       that can be used within its region.
   """
+  text = None  # Cached result of str(); the region and symbols don't change after construction.
+
   def __init__(self, region, symbols):
     super().__init__(region)
     self.symbols = SymbolSet(symbols)
 
   def __str__(self):
-    return super().__str__() + ': ' + str(self.symbols) + ' in ' + str(self.region)
+    """ The class name, symbols and region; built once and kept.
+        >>> str(RegionSymbolsConstraint('a1-a2', ['1', '2']))
+        'RegionSymbolsConstraint: (1 2) in [a1 a2]'
+    """
+    if self.text is None:
+      self.text = super().__str__() + ': ' + str(self.symbols) + ' in ' + str(self.region)
+    return self.text
 
   def techniques(self):
     return super().techniques() + [self.filterFromPuzzle, self.solo, self.filterSolution]
@@ -174,9 +246,12 @@ class RegionSymbolsConstraint(RegionConstraint):
         Set that in the solution, and then we're done with this constraint.
     """
     if puzzle.solution and len(self.symbols) == 1:  # Only one symbol is possible
+      solution = puzzle.solution
+      symbols = self.symbols
       for location in self.region:
-        if puzzle.solution.setCell(location, self.symbols):
-          logging.debug("Solo: Placing %s at %s", self.symbols.value(), chess.location(location))
+        if solution.at(location) != symbols and solution.setCell(location, symbols):
+          if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("Solo: Placing %s at %s", symbols.value(), chess.location(location))
           puzzle.logTechnique('solo')
       return []
 
@@ -186,5 +261,6 @@ class RegionSymbolsConstraint(RegionConstraint):
     if puzzle.solution:
       result = puzzle.solution.intersectThroughout(self.region, self.symbols)
       if result:
-        logging.debug("Filter solution: symbols not in %s from %s", self.symbols, chess.locations(result))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+          logging.debug("Filter solution: symbols not in %s from %s", self.symbols, chess.locations(result))
         puzzle.logTechnique('filterSolution')
@@ -1,12 +1,11 @@
 """ A constraint that takes a list of symbol sets.
     Separated out here to avoid circular reference.
 """
-import itertools
 import logging
 
 from .permutations import RegionPermutesSymbols
 from .region import RegionSymbolsConstraint
-from .symbolSet import SymbolSet, SymbolList
+from .symbolSet import SymbolList
 
 class RegionSymbolLists(RegionSymbolsConstraint):
   """ A RegionSymbolsConstraint that knows several lists of symbols,
@@ -16,14 +15,22 @@ class RegionSymbolLists(RegionSymbolsConstraint):
       If there is only one symbol list and it doesn't contain duplicates, it's reduced to RegionPermutesSymbols.
   """
   def __init__(self, region, symbolSets):
-    super().__init__(region, SymbolSet(itertools.chain.from_iterable(symbolSets)))  # the union of all the sets
-    assert symbolSets
-    for s in symbolSets:
-      assert len(s) == self.region.size()
-    self.symbolLists = [SymbolList(s) for s in symbolSets]
+    super().__init__(region, set().union(*symbolSets))  # the union of all the sets
+    if __debug__:
+      size = self.region.size()
+      assert symbolSets
+      assert all(len(s) == size for s in symbolSets)
+    # Tuples, which are shared rather than copied when they come from the cached factor lists.
+    self.symbolLists = tuple(tuple(s) for s in symbolSets)
 
   def __str__(self):
-    return self.__class__.__name__ + ': one of [' + ', '.join([str(s) for s in self.symbolLists]) + '] in ' + str(self.region)
+    """ The class name, symbol lists and region; built once and kept, as in RegionSymbolsConstraint.
+        >>> str(RegionSymbolLists('a1-a2', [['1', '2'], ['3', '3']]))
+        'RegionSymbolLists: one of [(1 2), (3 3)] in [a1 a2]'
+    """
+    if self.text is None:
+      self.text = self.__class__.__name__ + ': one of [' + ', '.join([str(SymbolList(s)) for s in self.symbolLists]) + '] in ' + str(self.region)
+    return self.text
 
   def techniques(self):
     return super().techniques() + [self.makePermutation]
@@ -31,11 +38,10 @@ class RegionSymbolLists(RegionSymbolsConstraint):
   def filterFromPuzzle(self, puzzle):
     """ Overrides base case - must remove from the lists. """
     if puzzle.symbols:
-      for slist in self.symbolLists:
-        if len(SymbolSet(slist) - puzzle.symbols) > 0:
+      for i, slist in enumerate(self.symbolLists):
+        if not puzzle.symbols.issuperset(slist):
           # This symbol list has symbols that aren't in the puzzle: remove it.
-          new = self.symbolLists.copy()
-          new.remove(slist)
+          new = self.symbolLists[:i] + self.symbolLists[i+1:]
           return [RegionSymbolLists(self.region, new)]
 
   def makePermutation(self, puzzle):
@@ -49,6 +55,7 @@ class RegionSymbolLists(RegionSymbolsConstraint):
         # The symbol set always has the same number of symbols as any symbol list or fewer,
         # and we started with one symbol in each list per cell.
         new = RegionPermutesSymbols(self.region, self.symbols)
-        logging.debug("List to permutation: %s is now reduced to %s", self, new)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+          logging.debug("List to permutation: %s is now reduced to %s", self, new)
         puzzle.logTechnique('makePermutation')
         return [new]
@@ -2,20 +2,41 @@
     using a Python set of strings, one per symbol.
 
     Also includes a class for a list of symbols, that can have repeats.
-"""
 
-import itertools
+    Neither is changed after it's built (new ones are made instead),
+    so each keeps its string form once it has been asked for.
+"""
 
 class SymbolList(list):
+  __slots__ = ('text',)  # the cached result of str(), set the first time it's asked for
+
   def __str__(self):
-    return '(' + ' '.join(sorted(self)) + ')'
+    """ The symbols in sorted order, with repeats.
+        >>> str(SymbolList(['2', '1', '2']))
+        '(1 2 2)'
+    """
+    try:
+      return self.text
+    except AttributeError:
+      self.text = '(' + ' '.join(sorted(self)) + ')'
+      return self.text
 
 class SymbolSet(set):
+  __slots__ = ('text',)  # the cached result of str(), set the first time it's asked for
+
   def __str__(self):
-    return SymbolList(self).__str__()
+    """ The symbols in sorted order.
+        >>> str(SymbolSet(['2', '1']))
+        '(1 2)'
+    """
+    try:
+      return self.text
+    except AttributeError:
+      self.text = SymbolList(self).__str__()
+      return self.text
 
   def value(self):
     """ Returns an arbitrarily-chosen value from the set.
         Primiarily useful if the set is already known to contain only one value.
     """
-    return next(itertools.islice(self, 1))
\ No newline at end of file
+    return next(iter(self))
\ No newline at end of file
@@ -3,10 +3,9 @@
 
 import click
 import logging
-import os
 
-import puzzle
-from constraints import chess
+# The solver itself is imported by the commands that use it,
+# so that --help and argument errors don't have to load it.
 
 @click.group()
 
@@ -25,6 +24,9 @@ def cli():
 @click.option('-ss', '--single-step', 'singleStep', flag_value=2, help="Pause at each inference")
 def solve(input, loglevel, debugToFile, singleStep):
   """ Solve a puzzle specified by one or more INPUT constraints files. """
+  import os
+  import puzzle
+
   if debugToFile:
     loglevel = logging.DEBUG
     logFileName = 'debug.log'
@@ -75,6 +77,7 @@ def showStep(name):
   click.confirm("Continue?", default=True, abort=True)
 
 def showSolutionChange(placements, location, old, new):
+  from constraints import chess
   if len(new) == 1:
     click.echo(placements)
     click.echo("Changed %s from %s to %s" % (chess.location(location), old, new))
@@ -88,7 +91,8 @@ def test(verbose):
   # Using docstrings:
   import doctest
   import placements
-  from constraints import chess, listutils, region, permutations, numbers, factoring
+  import puzzle
+  from constraints import chess, listutils, region, permutations, numbers, factoring, regionSymbolLists, symbolSet
   doctest.testmod(verbose=verbose)
   doctest.testmod(chess, verbose=verbose)
   doctest.testmod(listutils, verbose=verbose)
@@ -98,6 +102,8 @@ def test(verbose):
   doctest.testmod(puzzle, verbose=verbose)
   doctest.testmod(region, verbose=verbose)
   doctest.testmod(factoring, verbose=verbose)
+  doctest.testmod(regionSymbolLists, verbose=verbose)
+  doctest.testmod(symbolSet, verbose=verbose)
 
   # Test command-line interface and solving:
   from click.testing import CliRunner
@@ -2,6 +2,7 @@ import itertools
 import logging
 
 from constraints import chess
+from constraints.region import Region
 from constraints.symbolSet import SymbolSet
 
 def showCell(cell):
@@ -15,6 +16,17 @@ def showCell(cell):
   else:
     return str(cell)
 
+def blank(size):
+  """ Returns a Placements of the given size with '*' in every cell,
+      built directly rather than by parsing.
+      >>> print(blank([2, 3]))
+      [ * * *
+        * * * ]
+  """
+  p = Placements(None)
+  p.cells = [[SymbolSet('*') for col in range(size[1])] for row in range(size[0])]
+  return p
+
 class Placements():
   """ A copy of an entire puzzle grid, with a set of possible symbols for each cell.
       If a cell has only one symbol, it's fully determined.
@@ -23,6 +35,10 @@ class Placements():
   # A list of lists (for two dimensions), each cell of which contains a SymbolSet of possible symbols.
   cells = None
   changed = False
+  changeCount = 0  # Incremented on every change, so callers can tell if anything has changed since they last looked.
+  indexes = None  # Cached results of indexSymbolsIn(), by region cell set, while changeCount is indexedAt.
+  indexedAt = None
+  starFree = False  # True once expandStars() has replaced every '*', until setCell() puts one back.
   onChange = None  # Called whenever anything changes, with (self, location, old, new).
 
   def __init__(self, initial):
@@ -83,7 +99,7 @@ class Placements():
     """ Iterate through all locations in the grid. """
     for row in range(len(self.cells)):
       for col in range(len(self.cells[row])):
-        yield (row, col)
+        yield chess.locationAt(row, col)
 
   def isSolved(self):
     """ Return True iff all cells contain one item.
@@ -114,14 +130,58 @@ class Placements():
     """
     return self.cells[location[0]][location[1]]
 
+  def expandStars(self, symbols):
+    """ Replace every cell that contains '*' with the given symbols.
+        Return True if any were replaced.
+        Once the grid is known to have no stars left, this returns immediately.
+          >>> p = Placements(['1*'])
+          >>> p.expandStars(['1', '2'])
+          True
+          >>> print(p)
+          [ 1 (1 2) ]
+          >>> p.expandStars(['1', '2'])
+          False
+    """
+    if self.starFree:
+      return False
+    expanded = False
+    for location in self.allLocations():
+      if self.at(location).value() == '*':
+        self.setCell(location, symbols)
+        expanded = True
+    self.starFree = True
+    return expanded
+
   def indexSymbolsIn(self, region):
     """ Return a reverse index, that maps a single symbol to a list of locations where it occurs.
         Limits the index to the locations within the given region.
+        For a Region, the index is cached until the next change, so don't modify it.
+          >>> p = Placements(['12', '13'])
+          >>> p.indexSymbolsIn(Region('a1-b2')) == {'1': [(0, 0), (1, 0)], '2': [(0, 1)], '3': [(1, 1)]}
+          True
+          >>> p.indexSymbolsIn(Region('a1-b2')) is p.indexSymbolsIn(Region('a1-b2'))
+          True
     """
+    if isinstance(region, Region):
+      if self.indexedAt != self.changeCount:
+        self.indexes = {}
+        self.indexedAt = self.changeCount
+      index = self.indexes.get(region.cellSet)
+      if index is None:
+        index = self.indexes[region.cellSet] = self.buildIndex(region)
+      return index
+    return self.buildIndex(region)
+
+  def buildIndex(self, region):
+    """ Build the index for indexSymbolsIn(). """
     index = {}
+    cells = self.cells
     for location in region:
-      for s in self.at(location):
-        index.setdefault(s, []).append(location)
+      for s in cells[location[0]][location[1]]:
+        if s in index:
+          index[s].append(location)
+        else:
+          index[s] = [location]
     return index
 
   def setCell(self, location, contents):
@@ -141,6 +201,9 @@ class Placements():
       self.cells[location[0]][location[1]] = new
       # logging.debug("setCell: %s = %s", chess.location(location), new)
       self.changed = True
+      self.changeCount += 1
+      if '*' in new:
+        self.starFree = False
       return True
     return False
 
@@ -172,6 +235,8 @@ class Placements():
     cell = self.cells[location[0]][location[1]]
     if len(cell) == 1 and cell.value() == '*':
       new = SymbolSet(symbols)
+    elif cell.issubset(symbols):
+      return False  # nothing to eliminate
     else:
       new = SymbolSet(cell & symbols)
     return self.setCell(location, new)
@@ -6,7 +6,10 @@ import pathlib
 import yaml
 
 from constraints import *
-from placements import Placements
+from placements import Placements, blank
+
+# Use the libyaml parser when PyYAML was built with it; it's much faster than the pure-Python one.
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 def concatWithSep(elements, sep = ','):
   return sep.join(x for x in elements if x)
@@ -19,12 +22,16 @@ class Puzzle:
     self.dimensions = None
     self.size = None
     self.symbols = None  # a SymbolSet
+    self.symbolValues = None  # maps each symbol to its integer value, for numeric symbols
     self.symbolsAreChars = True  # True if all symbols are single-character strings  (to do: default to None and set with symbols)
     self.initial = None  # a Placement
     self.solution = None  # a Placement, set when a solution is found
     self.stats = {}
     self.techniqueCallback = None  # Set to call back each time a technique is used.
     self.solutionCallback = None  # Set to call back each time the solution is changed.
+    self.sizeCallbacks = []  # Called once each, with this Puzzle, when the size becomes known.
+    self.typedConstraints = {}  # Cached lookups by constraint type, for the list in typedConstraintsOf.
+    self.typedConstraintsOf = None
 
   def addConstraints(self, constraints):
     """ Add constraints from various sources, distinguished by type.
@@ -41,7 +48,7 @@ class Puzzle:
       return
     logging.debug("Loading constraints: %s", constraints)
     if isinstance(constraints, io.IOBase):
-      self.addConstraints(yaml.safe_load(constraints))
+      self.addConstraints(yaml.load(constraints, Loader=_YAML_LOADER))
     elif isinstance(constraints, list):
       for constraint in constraints:
         self.addConstraints(constraint)
@@ -133,6 +140,52 @@ class Puzzle:
     """ Returns a printable list of the current constraint set. """
     return '{\n  ' + '\n  '.join([str(c) for c in self.constraints]) + '\n}'
 
+  def constraintsOfType(self, constraintClass):
+    """ Return a list of the current constraints that are instances of the given class.
+        The list is cached until the constraint list changes, so don't modify it.
+          >>> p = Puzzle()
+          >>> p.addConstraints(['SymbolsNumericDigits', 'a1+a2 = 3'])
+          >>> [str(c) for c in p.constraintsOfType(Math)]
+          ['Math: a1+a2 = 3']
+    """
+    key = (constraintClass, len(self.constraints))  # the length catches appends
+    result = self.cachedTypedConstraints().get(key)
+    if result is None:
+      result = self.typedConstraints[key] = [c for c in self.constraints if isinstance(c, constraintClass)]
+    return result
+
+  def constraintsSharingCells(self, constraintClass, region):
+    """ Return the current constraints that are instances of the given class,
+        and whose regions have at least one cell in the given region,
+        in the same order as constraintsOfType().
+          >>> p = Puzzle()
+          >>> p.addConstraints(['SymbolsNumericDigits', 'a1+a2 = 3', 'b1+b2 = 3'])
+          >>> [str(c) for c in p.constraintsSharingCells(Math, region.Region('b1 c1'))]
+          ['Math: b1+b2 = 3']
+    """
+    key = ('cells', constraintClass, len(self.constraints))
+    byCell = self.cachedTypedConstraints().get(key)
+    if byCell is None:
+      # Map each cell to the (position, constraint) pairs whose regions include it.
+      byCell = self.typedConstraints[key] = {}
+      for i, c in enumerate(self.constraintsOfType(constraintClass)):
+        for cell in c.region:
+          byCell.setdefault(cell, []).append((i, c))
+    found = {}
+    for cell in region:
+      for i, c in byCell.get(cell, ()):
+        found[i] = c
+    return [found[i] for i in sorted(found)]
+
+  def cachedTypedConstraints(self):
+    """ Return the cache for constraintsOfType() and constraintsSharingCells(),
+        emptying it first if the constraint list has been replaced.
+    """
+    if self.typedConstraintsOf is not self.constraints:
+      self.typedConstraints = {}
+      self.typedConstraintsOf = self.constraints
+    return self.typedConstraints
+
   def formatSize(self, size):
     return '(' + functools.reduce(lambda a, b: a + 'x' + b, map(str, self.size)) + ")"
 
@@ -152,6 +205,18 @@ class Puzzle:
       else:
         self.setDimensions(len(size))
         self.size = size
+        callbacks, self.sizeCallbacks = self.sizeCallbacks, []
+        for callback in callbacks:
+          callback(self)
+
+  def onSizeKnown(self, callback):
+    """ Arrange for callback(puzzle) to be called when the size is set.
+        >>> p = Puzzle()
+        >>> p.onSizeKnown(lambda puzzle: print(puzzle))
+        >>> p.setSize([3, 3])
+        (3x3)
+    """
+    self.sizeCallbacks.append(callback)
 
   def setInitial(self, initial):
     """ Sets the initial contents of the grid.
@@ -172,19 +237,26 @@ class Puzzle:
       self.setSize(self.initial.size())
       self.expandStars()
 
+  def setBlankInitial(self):
+    """ Sets the initial contents of the grid to '*' in every cell, once the size is known.
+          >>> p = Puzzle()
+          >>> p.setSize([2, 2])
+          >>> p.setBlankInitial()
+          >>> print(p)
+          [ * *
+            * * ]
+    """
+    self.initial = blank(self.size)
+    self.solution = blank(self.size)
+    self.expandStars()
+
   def expandStars(self):
     """ For every cell in the solution that contains '*',
         replace the '*' with a list of all the symbols.
     """
-    logged = False
     if self.size and self.solution and self.symbols:
-      for location in region.Region(self.size):
-        cell = self.solution.at(location)
-        if cell.value() == '*':
-          if not logged:
-            logging.debug("Expanding stars.")
-            logged = True
-          self.solution.setCell(location, self.symbols)
+      if self.solution.expandStars(self.symbols):
+        logging.debug("Expanding stars.")
 
   def reduceConstraints(self):
     """ Apply all constraints.
@@ -239,8 +311,9 @@ class Puzzle:
       p.solutionCallback = None  # Don't report these changes, because we don't know if they're correct yet.
       p.solution.onChange = None
 
-      logging.debug("\nSetting %s from %s to %s as a guess, then continuing.",
-        chess.location(location), cell, s)
+      if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("\nSetting %s from %s to %s as a guess, then continuing.",
+          chess.location(location), cell, s)
       p.solution.setCell(location, {s})
       p.logTechnique('guess')
       logging.debug("New puzzle:\n%s", p)